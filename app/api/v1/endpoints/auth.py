@@ -1,19 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from app.core import deps, security
+from app.core.cache import invalidate_user
 from app.schemas.user import UserCreate, User
 from app.models.user import User as UserModel
-from app.core.security import verify_password, get_password_hash
+from app.core.security import verify_and_update_password, get_password_hash
 
 router = APIRouter()
 
-@router.post("/login")
+@router.post(
+    "/login",
+    dependencies=[
+        Depends(deps.rate_limit(
+            lambda request: f"rl:login:ip:{deps.client_ip(request)}",
+            "LOGIN"
+        )),
+        Depends(deps.rate_limit(
+            lambda request: f"rl:login:user:{deps.hashed_username(request)}",
+            "LOGIN"
+        ))
+    ]
+)
 async def login(
     request: Request,
     response: Response,
     username: str,
     password: str,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """
     Login endpoint using session.
@@ -21,58 +37,75 @@ async def login(
     Design Decisions:
     - Find user by username.
     - Verify the provided password against the stored hashed password.
+    - Verify against a dummy hash for unknown users so response timing does not reveal which usernames exist.
+    - Rehash deprecated (bcrypt) password hashes with argon2id after a successful login.
     - Set user_id in session if authentication is successful.
     - Use appropriate error handling to manage edge cases.
     """
     # Find user by username
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username or password")
+    user = await db.scalar(select(UserModel).where(UserModel.username == username))
 
     # Verify password
-    if not verify_password(password, user.hashed_password):
+    # Password hashing is CPU-bound; run it off the event loop
+    password_valid, new_hash = await run_in_threadpool(
+        verify_and_update_password, password, user.hashed_password if user else None
+    )
+    if not user or not password_valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username or password")
 
+    # Upgrade legacy bcrypt hashes to argon2id
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     # Set user_id in session
     request.session['user_id'] = user.id
 
     return {"msg": "Login successful"}
 
-@router.post("/register", response_model=User)
+@router.post(
+    "/register",
+    response_model=User,
+    dependencies=[
+        Depends(deps.rate_limit(
+            lambda request: f"rl:register:ip:{deps.client_ip(request)}",
+            "REGISTER"
+        ))
+    ]
+)
 async def register(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreate
 ):
     """
     Register a new user.
     
     Design Decisions:
-    - Check if username/email already exists.
-    - Hash the password.
-    - Create the user in the database.
-    - Return the user data.
+    - Hash the password first, so duplicate and new usernames take the same time.
+    - Insert with ON CONFLICT DO NOTHING: the unique constraints on username and
+      email reject duplicates in the same round-trip, with no pre-check and no
+      IntegrityError handling, and concurrent registrations cannot both succeed.
+    - Return the user data from the INSERT's RETURNING clause.
     """
-    print("inside register PS",user_in)
-     # Check if username or email already exists
-    if db.query(UserModel).filter(UserModel.username == user_in.username).first() or db.query(UserModel).filter(UserModel.email == user_in.email).first():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username or email already registered")
-
     # Hash the password
-    hashed_password = get_password_hash(user_in.password)
-    print("hashed password",hashed_password)
+    hashed_password = await run_in_threadpool(get_password_hash, user_in.password)
 
-    # Create the user in the database
-    user = UserModel(
-        email=user_in.email,
-        username=user_in.username,
-        hashed_password=hashed_password,
-        is_active=True
+    # Create the user in the database unless the username or email is taken
+    user = await db.scalar(
+        insert(UserModel)
+        .values(
+            email=user_in.email,
+            username=user_in.username,
+            hashed_password=hashed_password,
+            is_active=True
+        )
+        .on_conflict_do_nothing()
+        .returning(UserModel)
     )
-    print("user PS->>>", user)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username or email already registered")
+    await db.commit()
 
     return user
 
@@ -83,6 +116,9 @@ async def logout(request: Request):
     
     Design Decisions:
     - Clear the user_id from the session.
+    - Drop the cached user record so it is not served after logout.
     """
-    request.session.pop('user_id', None)
+    user_id = request.session.pop('user_id', None)
+    if user_id:
+        await invalidate_user(user_id)
     return {"msg": "Logout successful"}
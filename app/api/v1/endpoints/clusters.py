@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from typing import List
 from app.core import deps
-from app.schemas.cluster import Cluster, ClusterCreate
+from app.core.cache import (
+    clusters_cache_key,
+    conditional_json_response,
+    get_cached_json,
+    invalidate_clusters,
+    set_cached_json,
+)
+from app.core.config import get_settings
+from app.schemas.cluster import Cluster, ClusterCreate, ClusterListItem
 from app.models.user import User
 from app.models.cluster import Cluster as ClusterModel
 
 router = APIRouter()
 
+cluster_adapter = TypeAdapter(Cluster)
+cluster_list_adapter = TypeAdapter(List[ClusterListItem])
+
 def validate_resource_limits(cluster_in: ClusterCreate):
     """
     Validate resource limits are non-negative and reasonable.
@@ -38,9 +52,9 @@ def validate_resource_limits(cluster_in: ClusterCreate):
         )
 
 @router.post("/", response_model=Cluster)
-def create_cluster(
+async def create_cluster(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     cluster_in: ClusterCreate,
     current_user: User = Depends(deps.get_current_user)
 ):
@@ -64,36 +78,28 @@ def create_cluster(
     # Validate resource limits
     validate_resource_limits(cluster_in)
     
-    try:
-        # Create new cluster with full resource availability
-        cluster = ClusterModel(
-            name=cluster_in.name,
-            organization_id=cluster_in.organization_id,
-            cpu_limit=cluster_in.cpu_limit,
-            ram_limit=cluster_in.ram_limit,
-            gpu_limit=cluster_in.gpu_limit,
-            # Initialize available resources equal to limits
-            cpu_available=cluster_in.cpu_limit,
-            ram_available=cluster_in.ram_limit,
-            gpu_available=cluster_in.gpu_limit
-        )
-        
-        db.add(cluster)
-        db.commit()
-        db.refresh(cluster)
-        return cluster
+    # Create new cluster with full resource availability
+    cluster = ClusterModel(
+        name=cluster_in.name,
+        organization_id=cluster_in.organization_id,
+        cpu_limit=cluster_in.cpu_limit,
+        ram_limit=cluster_in.ram_limit,
+        gpu_limit=cluster_in.gpu_limit,
+        # Initialize available resources equal to limits
+        cpu_available=cluster_in.cpu_limit,
+        ram_available=cluster_in.ram_limit,
+        gpu_available=cluster_in.gpu_limit
+    )
     
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error creating cluster: {str(e)}"
-        )
+    db.add(cluster)
+    await db.commit()
+    await invalidate_clusters(cluster.organization_id)
+    return cluster
 
-@router.get("/", response_model=List[Cluster])
-def list_clusters(
+@router.get("/", response_model=List[ClusterListItem])
+async def list_clusters(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(deps.get_current_user)
@@ -108,31 +114,45 @@ def list_clusters(
             detail="User must belong to an organization to list clusters"
         )
     
-    try:
-        clusters = (
-            db.query(ClusterModel)
-            .filter(ClusterModel.organization_id == current_user.organization_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        return clusters
+    cache_key = await clusters_cache_key(current_user.organization_id, f"skip:{skip}:limit:{limit}")
+    cached = await get_cached_json(cache_key)
+    if cached:
+        return Response(content=cached, media_type="application/json")
     
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving clusters: {str(e)}"
-        )
+    result = await db.execute(
+        select(ClusterModel)
+        # Only load the columns exposed by ClusterListItem
+        .options(load_only(
+            ClusterModel.id,
+            ClusterModel.name,
+            ClusterModel.organization_id,
+            ClusterModel.cpu_available,
+            ClusterModel.ram_available,
+            ClusterModel.gpu_available
+        ))
+        .where(ClusterModel.organization_id == current_user.organization_id)
+        .offset(skip)
+        .limit(limit)
+    )
+    clusters = result.scalars().all()
+    payload = cluster_list_adapter.dump_json(
+        cluster_list_adapter.validate_python(clusters, from_attributes=True)
+    )
+    await set_cached_json(cache_key, payload, get_settings().CLUSTER_CACHE_TTL)
+    return Response(content=payload, media_type="application/json")
 
 @router.get("/{cluster_id}", response_model=Cluster)
-def get_cluster(
+async def get_cluster(
     *,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
     cluster_id: int,
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     Get detailed information about a specific cluster.
+    
+    Responses carry an ETag; a matching If-None-Match returns 304 without a body.
     """
     # Check if user belongs to an organization
     if not current_user.organization_id:
@@ -141,24 +161,25 @@ def get_cluster(
             detail="User must belong to an organization to access clusters"
         )
     
-    try:
-        cluster = db.query(ClusterModel).filter(
+    cache_key = await clusters_cache_key(current_user.organization_id, f"cluster:{cluster_id}")
+    cached = await get_cached_json(cache_key)
+    if cached:
+        return conditional_json_response(request, cached)
+    
+    cluster = await db.scalar(
+        select(ClusterModel).where(
             ClusterModel.id == cluster_id,
             ClusterModel.organization_id == current_user.organization_id
-        ).first()
-        
-        if not cluster:
-            raise HTTPException(
-                status_code=404,
-                detail="Cluster not found"
-            )
-        
-        return cluster
+        )
+    )
     
-    except HTTPException:
-        raise
-    except Exception as e:
+    if not cluster:
         raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving cluster: {str(e)}"
+            status_code=404,
+            detail="Cluster not found"
         )
+    
+    payload = cluster_adapter.dump_json(cluster_adapter.validate_python(cluster, from_attributes=True))
+    await set_cached_json(cache_key, payload, get_settings().CLUSTER_CACHE_TTL)
+    return conditional_json_response(request, payload)
+
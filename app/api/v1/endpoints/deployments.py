@@ -1,89 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.core import deps
+from app.core.cache import conditional_json_response, invalidate_clusters
 from app.schemas.deployment import Deployment, DeploymentCreate
 from app.models.user import User
 from app.models.deployment import Deployment as DeploymentModel, DeploymentStatus
 from app.models.cluster import Cluster as ClusterModel
-from sqlalchemy import and_
+from sqlalchemy import Row, and_, func, or_, select, update
 
 router = APIRouter()
 
-def check_resource_availability(cluster: ClusterModel, deployment: DeploymentCreate) -> bool:
-    """Check if cluster has enough resources for deployment."""
-    return all([
-        cluster.cpu_available >= deployment.cpu_required,
-        cluster.ram_available >= deployment.ram_required,
-        cluster.gpu_available >= deployment.gpu_required
-    ])
+deployment_adapter = TypeAdapter(Deployment)
 
-def allocate_resources(db: Session, cluster: ClusterModel, deployment: DeploymentCreate) -> bool:
-    """Allocate resources from cluster for deployment."""
-    cluster.cpu_available -= deployment.cpu_required
-    cluster.ram_available -= deployment.ram_required
-    cluster.gpu_available -= deployment.gpu_required
-    db.add(cluster)
-    return True
+async def allocate_resources(db: AsyncSession, cluster_id: int, deployment: DeploymentCreate) -> bool:
+    """
+    Atomically allocate resources from cluster for deployment.
+    
+    The availability check and the decrement happen in one conditional UPDATE,
+    so concurrent requests cannot overcommit the cluster. Returns False if the
+    cluster does not have enough resources.
+    """
+    result = await db.execute(
+        update(ClusterModel)
+        .where(
+            and_(
+                ClusterModel.id == cluster_id,
+                ClusterModel.cpu_available >= deployment.cpu_required,
+                ClusterModel.ram_available >= deployment.ram_required,
+                ClusterModel.gpu_available >= deployment.gpu_required
+            )
+        )
+        .values(
+            cpu_available=ClusterModel.cpu_available - deployment.cpu_required,
+            ram_available=ClusterModel.ram_available - deployment.ram_required,
+            gpu_available=ClusterModel.gpu_available - deployment.gpu_required
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
 
-def deallocate_resources(db: Session, deployment: DeploymentModel):
-    """Return resources back to the cluster."""
-    cluster = deployment.cluster
-    cluster.cpu_available += deployment.cpu_required
-    cluster.ram_available += deployment.ram_required
-    cluster.gpu_available += deployment.gpu_required
-    db.add(cluster)
+async def deallocate_resources(db: AsyncSession, cluster_id: int, cpu: float, ram: float, gpu: float):
+    """Atomically return resources back to the cluster."""
+    await db.execute(
+        update(ClusterModel)
+        .where(ClusterModel.id == cluster_id)
+        .values(
+            cpu_available=ClusterModel.cpu_available + cpu,
+            ram_available=ClusterModel.ram_available + ram,
+            gpu_available=ClusterModel.gpu_available + gpu
+        )
+        .execution_options(synchronize_session=False)
+    )
 
-def find_preemptible_deployments(
-    db: Session,
+async def find_preemptible_deployments(
+    db: AsyncSession,
     cluster: ClusterModel,
     required_resources: DeploymentCreate,
     new_priority: int
-) -> List[DeploymentModel]:
-    """Find lower priority deployments that could be preempted."""
-    running_deployments = db.query(DeploymentModel).filter(
-        and_(
-            DeploymentModel.cluster_id == cluster.id,
-            DeploymentModel.status == DeploymentStatus.RUNNING,
-            DeploymentModel.priority < new_priority
+) -> List[Row]:
+    """
+    Find lower priority deployments that could be preempted.
+    
+    Running totals of the resources freed by preempting deployments in priority
+    order are computed in SQL, so only the shortest prefix that satisfies the
+    request is returned instead of every lower priority deployment.
+    """
+    preemption_order = (DeploymentModel.priority, DeploymentModel.id)
+    
+    def freed_before(column):
+        # Resources freed by the deployments ahead of this one in preemption order
+        return func.coalesce(
+            func.sum(column).over(order_by=preemption_order, rows=(None, -1)), 0
         )
-    ).order_by(DeploymentModel.priority).all()
-    
-    # Calculate total resources that could be freed
-    cpu_available = cluster.cpu_available
-    ram_available = cluster.ram_available
-    gpu_available = cluster.gpu_available
-    to_preempt = []
-    
-    for deployment in running_deployments:
-        cpu_available += deployment.cpu_required
-        ram_available += deployment.ram_required
-        gpu_available += deployment.gpu_required
-        to_preempt.append(deployment)
-        
-        if all([
-            cpu_available >= required_resources.cpu_required,
-            ram_available >= required_resources.ram_required,
-            gpu_available >= required_resources.gpu_required
-        ]):
-            return to_preempt
+    
+    candidates = (
+        select(
+            DeploymentModel.id,
+            DeploymentModel.priority,
+            DeploymentModel.cpu_required,
+            DeploymentModel.ram_required,
+            DeploymentModel.gpu_required,
+            freed_before(DeploymentModel.cpu_required).label("cpu_freed_before"),
+            freed_before(DeploymentModel.ram_required).label("ram_freed_before"),
+            freed_before(DeploymentModel.gpu_required).label("gpu_freed_before")
+        )
+        .where(
+            and_(
+                DeploymentModel.cluster_id == cluster.id,
+                DeploymentModel.status == DeploymentStatus.RUNNING,
+                DeploymentModel.priority < new_priority
+            )
+        )
+        .cte("candidates")
+    )
+    
+    # Keep every deployment reached while the freed resources still fall short
+    result = await db.execute(
+        select(candidates)
+        .where(
+            or_(
+                cluster.cpu_available + candidates.c.cpu_freed_before < required_resources.cpu_required,
+                cluster.ram_available + candidates.c.ram_freed_before < required_resources.ram_required,
+                cluster.gpu_available + candidates.c.gpu_freed_before < required_resources.gpu_required
+            )
+        )
+        .order_by(candidates.c.priority, candidates.c.id)
+    )
+    to_preempt = result.all()
+    
+    if not to_preempt:
+        return []
+    
+    # Preemption is only worthwhile if freeing the whole prefix is enough
+    last = to_preempt[-1]
+    if all([
+        cluster.cpu_available + last.cpu_freed_before + last.cpu_required >= required_resources.cpu_required,
+        cluster.ram_available + last.ram_freed_before + last.ram_required >= required_resources.ram_required,
+        cluster.gpu_available + last.gpu_freed_before + last.gpu_required >= required_resources.gpu_required
+    ]):
+        return to_preempt
     
     return []
 
 async def preempt_deployments(
-    db: Session,
-    deployments: List[DeploymentModel]
+    db: AsyncSession,
+    cluster_id: int,
+    deployments: List[Row]
 ):
-    """Preempt running deployments and free their resources."""
-    for deployment in deployments:
-        deployment.status = DeploymentStatus.FAILED
-        deallocate_resources(db, deployment)
-        db.add(deployment)
+    """
+    Preempt running deployments and free their resources.
+    
+    Uses one UPDATE for all deployment statuses and one for the cluster totals.
+    Only deployments still running are preempted, and only their resources are returned.
+    """
+    result = await db.execute(
+        update(DeploymentModel)
+        .where(
+            and_(
+                DeploymentModel.id.in_([deployment.id for deployment in deployments]),
+                DeploymentModel.status == DeploymentStatus.RUNNING
+            )
+        )
+        .values(status=DeploymentStatus.FAILED)
+        .returning(
+            DeploymentModel.cpu_required,
+            DeploymentModel.ram_required,
+            DeploymentModel.gpu_required
+        )
+        .execution_options(synchronize_session=False)
+    )
+    preempted = result.all()
+    
+    await deallocate_resources(
+        db,
+        cluster_id,
+        cpu=sum(row.cpu_required for row in preempted),
+        ram=sum(row.ram_required for row in preempted),
+        gpu=sum(row.gpu_required for row in preempted)
+    )
 
 @router.post("/", response_model=Deployment)
 async def create_deployment(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     deployment_in: DeploymentCreate,
     current_user: User = Depends(deps.get_current_user),
     background_tasks: BackgroundTasks
@@ -92,12 +173,14 @@ async def create_deployment(
     Create a new deployment with preemption-based scheduling.
     """
     # Verify user's organization owns the cluster
-    cluster = db.query(ClusterModel).filter(
-        and_(
-            ClusterModel.id == deployment_in.cluster_id,
-            ClusterModel.organization_id == current_user.organization_id
+    cluster = await db.scalar(
+        select(ClusterModel).where(
+            and_(
+                ClusterModel.id == deployment_in.cluster_id,
+                ClusterModel.organization_id == current_user.organization_id
+            )
         )
-    ).first()
+    )
     
     if not cluster:
         raise HTTPException(status_code=404, detail="Cluster not found or access denied")
@@ -110,86 +193,49 @@ async def create_deployment(
     ]):
         raise HTTPException(status_code=400, detail="Resource requirements cannot be negative")
     
-    try:
-        # Check resource availability
-        if check_resource_availability(cluster, deployment_in):
-            # Create deployment with available resources
-            deployment = DeploymentModel(
-                name=deployment_in.name,
-                cluster_id=deployment_in.cluster_id,
-                docker_image=deployment_in.docker_image,
-                cpu_required=deployment_in.cpu_required,
-                ram_required=deployment_in.ram_required,
-                gpu_required=deployment_in.gpu_required,
-                priority=deployment_in.priority,
-                status=DeploymentStatus.PENDING
-            )
-            
-            # Allocate resources and start deployment
-            allocate_resources(db, cluster, deployment_in)
-            deployment.status = DeploymentStatus.RUNNING
-            
-            db.add(deployment)
-            db.commit()
-            db.refresh(deployment)
-            return deployment
+    deployment = DeploymentModel(
+        name=deployment_in.name,
+        cluster_id=deployment_in.cluster_id,
+        docker_image=deployment_in.docker_image,
+        cpu_required=deployment_in.cpu_required,
+        ram_required=deployment_in.ram_required,
+        gpu_required=deployment_in.gpu_required,
+        priority=deployment_in.priority,
+        status=DeploymentStatus.PENDING
+    )
+    
+    # Allocate resources and start deployment if the cluster has capacity
+    if await allocate_resources(db, cluster.id, deployment_in):
+        deployment.status = DeploymentStatus.RUNNING
+    
+    # If resources unavailable, check for preemption possibilities
+    elif deployment_in.priority > 0:
+        preemptible = await find_preemptible_deployments(
+            db, cluster, deployment_in, deployment_in.priority
+        )
         
-        # If resources unavailable, check for preemption possibilities
-        if deployment_in.priority > 0:
-            preemptible = find_preemptible_deployments(
-                db, cluster, deployment_in, deployment_in.priority
-            )
+        if preemptible:
+            # Preempt lower priority deployments
+            await preempt_deployments(db, cluster.id, preemptible)
             
-            if preemptible:
-                # Create new deployment
-                deployment = DeploymentModel(
-                    name=deployment_in.name,
-                    cluster_id=deployment_in.cluster_id,
-                    docker_image=deployment_in.docker_image,
-                    cpu_required=deployment_in.cpu_required,
-                    ram_required=deployment_in.ram_required,
-                    gpu_required=deployment_in.gpu_required,
-                    priority=deployment_in.priority,
-                    status=DeploymentStatus.PENDING
-                )
-                
-                # Preempt lower priority deployments
-                await preempt_deployments(db, preemptible)
-                
-                # Allocate resources and start deployment
-                allocate_resources(db, cluster, deployment_in)
+            if await allocate_resources(db, cluster.id, deployment_in):
                 deployment.status = DeploymentStatus.RUNNING
-                
-                db.add(deployment)
-                db.commit()
-                db.refresh(deployment)
-                return deployment
-        
-        # If no preemption possible, set to pending
-        deployment = DeploymentModel(
-            name=deployment_in.name,
-            cluster_id=deployment_in.cluster_id,
-            docker_image=deployment_in.docker_image,
-            cpu_required=deployment_in.cpu_required,
-            ram_required=deployment_in.ram_required,
-            gpu_required=deployment_in.gpu_required,
-            priority=deployment_in.priority,
-            status=DeploymentStatus.PENDING
-        )
-        
-        db.add(deployment)
-        db.commit()
-        db.refresh(deployment)
-        return deployment
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error creating deployment: {str(e)}")
+            else:
+                # A concurrent allocation took the freed resources; keep the
+                # preempted deployments running and queue this one instead
+                await db.rollback()
+    
+    # If no allocation was possible the deployment stays pending
+    db.add(deployment)
+    await db.commit()
+    if deployment.status == DeploymentStatus.RUNNING:
+        await invalidate_clusters(current_user.organization_id)
+    return deployment
 
 @router.get("/", response_model=List[Deployment])
-def list_deployments(
+async def list_deployments(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(deps.get_current_user)
@@ -197,53 +243,45 @@ def list_deployments(
     """
     List deployments for user's organization.
     """
-    try:
-        deployments = (
-            db.query(DeploymentModel)
-            .join(ClusterModel)
-            .filter(ClusterModel.organization_id == current_user.organization_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        return deployments
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving deployments: {str(e)}"
-        )
+    result = await db.execute(
+        select(DeploymentModel)
+        .join(ClusterModel)
+        .where(ClusterModel.organization_id == current_user.organization_id)
+        .offset(skip)
+        .limit(limit)
+    )
+    deployments = result.scalars().all()
+    return deployments
 
 @router.get("/{deployment_id}", response_model=Deployment)
-def get_deployment(
+async def get_deployment(
     *,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
     deployment_id: int,
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     Get detailed deployment information.
+    
+    Responses carry an ETag; a matching If-None-Match returns 304 without a body.
     """
-    try:
-        deployment = (
-            db.query(DeploymentModel)
-            .join(ClusterModel)
-            .filter(
-                and_(
-                    DeploymentModel.id == deployment_id,
-                    ClusterModel.organization_id == current_user.organization_id
-                )
+    deployment = await db.scalar(
+        select(DeploymentModel)
+        .join(ClusterModel)
+        .where(
+            and_(
+                DeploymentModel.id == deployment_id,
+                ClusterModel.organization_id == current_user.organization_id
             )
-            .first()
         )
+    )
+    
+    if not deployment:
+        raise HTTPException(status_code=404, detail="Deployment not found")
         
-        if not deployment:
-            raise HTTPException(status_code=404, detail="Deployment not found")
-            
-        return deployment
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving deployment: {str(e)}"
-        )
+    payload = deployment_adapter.dump_json(
+        deployment_adapter.validate_python(deployment, from_attributes=True)
+    )
+    return conditional_json_response(request, payload)
+
@@ -1,90 +1,146 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app.core import deps
+from app.core.cache import invalidate_user
 from app.schemas.organization import Organization, OrganizationCreate
 from app.models.organization import Organization as OrganizationModel
 from app.models.user import User
-import secrets
 
 router = APIRouter()
 
+INVITE_CODE_ATTEMPTS = 5
+
+async def raise_membership_error(db: AsyncSession, user_id: int, invite_code: Optional[str] = None):
+    """
+    Explain why a membership UPDATE matched no rows.
+    
+    Only runs on the failure path; one query reads the user's state and, when
+    joining, whether the invite code exists.
+    """
+    query = select(User.is_active, User.organization_id).where(User.id == user_id)
+    if invite_code is not None:
+        query = query.add_columns(
+            select(OrganizationModel.id)
+            .where(OrganizationModel.invite_code == invite_code)
+            .scalar_subquery()
+            .label("invited_organization_id")
+        )
+    user = (await db.execute(query)).first()
+    
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="User is inactive")
+    if invite_code is None or user.organization_id is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="User already belongs to an organization"
+        )
+    raise HTTPException(
+        status_code=404,
+        detail="Organization not found"
+    )
+
+async def assign_organization(db: AsyncSession, user_id: int, organization_id: int):
+    """
+    Add the user to the organization if they are active and not yet a member of one.
+    
+    Design Decisions:
+    - The membership check and the assignment are one conditional UPDATE, so the
+      happy path needs no user SELECT and concurrent requests cannot both succeed.
+    - The user row is only read on failure, to report why the update matched nothing.
+    """
+    result = await db.execute(
+        update(User)
+        .where(
+            User.id == user_id,
+            User.organization_id.is_(None),
+            User.is_active.is_(True)
+        )
+        .values(organization_id=organization_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await raise_membership_error(db, user_id)
+
 @router.post("/", response_model=Organization)
-def create_organization(
+async def create_organization(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     organization_in: OrganizationCreate,
-    current_user: User = Depends(deps.get_current_user)
+    current_user_id: int = Depends(deps.validate_auth)
 ):
     """
     Create a new organization and set the current user as a member.
     """
-    # Check if user is already in an organization
-    if current_user.organization_id:
+    # Create new organization with a single INSERT ... RETURNING; the invite
+    # code comes from the column default, and in the rare case it collides the
+    # insert does nothing and is retried with a freshly generated code
+    for _ in range(INVITE_CODE_ATTEMPTS):
+        created = (await db.execute(
+            insert(OrganizationModel)
+            .values(name=organization_in.name)
+            .on_conflict_do_nothing(index_elements=[OrganizationModel.invite_code])
+            .returning(OrganizationModel.id, OrganizationModel.invite_code)
+        )).first()
+        if created:
+            organization_id, invite_code = created
+            break
+    else:
         raise HTTPException(
-            status_code=400,
-            detail="User already belongs to an organization"
+            status_code=500,
+            detail="Could not generate a unique invite code"
         )
     
-    # Generate a unique invite code
-    while True:
-        invite_code = secrets.token_urlsafe(8)
-        exists = db.query(OrganizationModel).filter(
-            OrganizationModel.invite_code == invite_code
-        ).first()
-        if not exists:
-            break
-    
-    # Create new organization
-    db_organization = OrganizationModel(
-        name=organization_in.name,
-        invite_code=invite_code
-    )
-    db.add(db_organization)
-    db.commit()
-    db.refresh(db_organization)
-    
-    # Add current user to organization
-    current_user.organization_id = db_organization.id
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    # Add current user to organization in the same transaction; if that fails
+    # the request's rollback discards the new organization as well
+    await assign_organization(db, current_user_id, organization_id)
+    await db.commit()
+    await invalidate_user(current_user_id)
 
-    return db_organization
+    return {"id": organization_id, "name": organization_in.name, "invite_code": invite_code}
     
 
-@router.post("/{invite_code}/join")
-def join_organization(
+@router.post(
+    "/{invite_code}/join",
+    dependencies=[
+        Depends(deps.rate_limit(
+            lambda request: f"rl:join:ip:{deps.client_ip(request)}",
+            "JOIN"
+        ))
+    ]
+)
+async def join_organization(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     invite_code: str,
-    current_user: User = Depends(deps.get_current_user)
+    current_user_id: int = Depends(deps.validate_auth)
 ):
     """
     Allow a user to join an organization using an invite code.
-    """
-    # Check if user is already in an organization
-    if current_user.organization_id:
-        raise HTTPException(
-            status_code=400,
-            detail="User already belongs to an organization"
-        )
-    
-    # Find organization by invite code
-    organization = db.query(OrganizationModel).filter(
-        OrganizationModel.invite_code == invite_code
-    ).first()
     
-    if not organization:
-        raise HTTPException(
-            status_code=404,
-            detail="Organization not found"
+    The happy path is a single statement; the failure reason is only looked up
+    when nothing was updated.
+    """
+    # Resolve the invite code and add the user in one UPDATE ... FROM organization
+    result = await db.execute(
+        update(User)
+        .where(
+            User.id == current_user_id,
+            User.organization_id.is_(None),
+            User.is_active.is_(True),
+            OrganizationModel.invite_code == invite_code
         )
+        .values(organization_id=OrganizationModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await raise_membership_error(db, current_user_id, invite_code)
     
-    # Add user to organization
-    current_user.organization_id = organization.id
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await invalidate_user(current_user_id)
     
     return {"message": "Successfully joined organization"}
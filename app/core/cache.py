@@ -0,0 +1,144 @@
+from functools import lru_cache
+from typing import Optional, Union
+from cachetools import TTLCache
+from fastapi import Request, Response
+from redis.exceptions import RedisError
+from app.core.config import get_settings
+from app.db.redis import get_redis
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only the columns get_current_user and downstream auth checks rely on
+USER_CACHE_FIELDS = ("id", "organization_id", "is_active")
+
+# Lets dashboards poll single resources without re-downloading unchanged bodies
+HTTP_CACHE_CONTROL = "private, max-age=5"
+
+# Per-process layer in front of Redis so most requests skip the network hop.
+# Bounded in size, and short-lived because other workers cannot invalidate it.
+@lru_cache
+def _local_users() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(maxsize=settings.USER_LOCAL_CACHE_SIZE, ttl=settings.USER_LOCAL_CACHE_TTL)
+
+def _user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+async def get_cached_user(user_id: int) -> Optional[dict]:
+    """
+    Return the cached user fields, or None on a miss.
+    
+    Checks the in-process cache before Redis. Redis errors are logged and
+    treated as a miss so auth falls back to the database.
+    """
+    fields = _local_users().get(user_id)
+    if fields is not None:
+        return fields
+    try:
+        raw = await get_redis().get(_user_key(user_id))
+    except RedisError as e:
+        logger.warning(f"Redis error reading user cache: {str(e)}")
+        return None
+    if not raw:
+        return None
+    fields = json.loads(raw)
+    _cache_locally(fields)
+    return fields
+
+def _cache_locally(fields: dict):
+    _local_users()[fields["id"]] = fields
+
+async def cache_user(fields: dict):
+    """
+    Store the auth-relevant user fields with a short TTL.
+    
+    Organization-less users are not cached at all. Joining or creating an
+    organization (None -> id) is the only change the API makes to these fields,
+    so the entries that are kept never go stale; an organization-less entry
+    could be written back by a slower request after create/join invalidated
+    it, or sit in another worker's local layer.
+    """
+    if fields["organization_id"] is None:
+        return
+    _cache_locally(fields)
+    try:
+        await get_redis().set(_user_key(fields["id"]), json.dumps(fields), ex=get_settings().USER_CACHE_TTL)
+    except RedisError as e:
+        logger.warning(f"Redis error writing user cache: {str(e)}")
+
+async def invalidate_user(user_id: int):
+    """
+    Drop the cached user so the next request reloads it from the database.
+    
+    Only this worker's local layer is cleared; no worker holds the
+    organization-less entries that create/join invalidate.
+    """
+    _local_users().pop(user_id, None)
+    try:
+        await get_redis().delete(_user_key(user_id))
+    except RedisError as e:
+        logger.warning(f"Redis error invalidating user cache: {str(e)}")
+
+def _clusters_version_key(organization_id: int) -> str:
+    return f"org:{organization_id}:clusters:version"
+
+async def clusters_cache_key(organization_id: int, suffix: str) -> Optional[str]:
+    """
+    Build a versioned cache key for an organization's cluster reads.
+    
+    Design Decisions:
+    - Mutations bump the version instead of deleting keys, so invalidation needs no SCAN.
+    - Returns None when Redis is unavailable, which disables caching for the request.
+    """
+    try:
+        version = await get_redis().get(_clusters_version_key(organization_id)) or "0"
+    except RedisError as e:
+        logger.warning(f"Redis error reading cluster cache version: {str(e)}")
+        return None
+    return f"org:{organization_id}:clusters:v{version}:{suffix}"
+
+async def get_cached_json(key: Optional[str]) -> Optional[str]:
+    """Return a cached JSON payload, or None on a miss."""
+    if key is None:
+        return None
+    try:
+        return await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"Redis error reading cache: {str(e)}")
+        return None
+
+async def set_cached_json(key: Optional[str], payload: bytes, ttl: int):
+    """Store a serialized JSON payload with a TTL."""
+    if key is None:
+        return
+    try:
+        await get_redis().set(key, payload, ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Redis error writing cache: {str(e)}")
+
+async def invalidate_clusters(organization_id: int):
+    """Invalidate every cached cluster read for the organization."""
+    try:
+        await get_redis().incr(_clusters_version_key(organization_id))
+    except RedisError as e:
+        logger.warning(f"Redis error invalidating cluster cache: {str(e)}")
+
+def conditional_json_response(request: Request, payload: Union[str, bytes]) -> Response:
+    """
+    Return a JSON payload with an ETag, or an empty 304 if the client's copy is current.
+    
+    The ETag is a digest of the serialized body, so it changes exactly when the
+    representation does and works the same for cached and freshly built payloads.
+    """
+    body = payload.encode() if isinstance(payload, str) else payload
+    etag = f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,3 +1,5 @@
+from functools import lru_cache
+from typing import List
 from pydantic_settings import BaseSettings
 import os
 
@@ -12,10 +14,43 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("PGDATABASE", "cluster_management")
     POSTGRES_PORT: str = os.getenv("PGPORT", "5432")
     
+    # Connection pool configuration
+    DB_POOL_SIZE: int = 25
+    DB_MAX_OVERFLOW: int = 25
+    DB_POOL_TIMEOUT: int = 10  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # 30 minutes in seconds
+    DB_POOL_USE_LIFO: bool = True  # Reuse the most recent connection so idle ones can time out
+    DB_PGBOUNCER: bool = False  # Set when DATABASE_URL points at PgBouncer in transaction mode
+    
+    # Browser origins allowed to call the API with the session cookie;
+    # set as a JSON list, e.g. CORS_ORIGINS='["https://app.example.com"]'
+    CORS_ORIGINS: List[str] = ["http://localhost:3000"]
+    
+    # Create missing tables on application startup (development only)
+    AUTO_CREATE_TABLES: bool = False
+    
     # Session configuration
-    SECRET_KEY: str = "TODO_CHANGE_THIS_SECRET_KEY"  # TODO: Change in production
     SESSION_COOKIE_NAME: str = "session"
-    SESSION_MAX_AGE: int = 1800  # 30 minutes in seconds
+    SESSION_MAX_AGE: int = 1800  # 30 minutes in seconds, sliding
+    SESSION_COOKIE_SECURE: bool = False  # Only send the session cookie over HTTPS
+    
+    # Worker threads for CPU-bound work such as password hashing
+    THREADPOOL_SIZE: int = int(os.getenv("THREADPOOL_SIZE", os.cpu_count() or 1))
+    
+    # Redis configuration
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    USER_CACHE_TTL: int = 300  # 5 minutes in seconds
+    USER_LOCAL_CACHE_SIZE: int = 10_000  # entries held in each worker process
+    USER_LOCAL_CACHE_TTL: int = 30  # seconds
+    CLUSTER_CACHE_TTL: int = 15  # seconds
+    
+    # Rate limiting (requests per window, window in seconds)
+    LOGIN_RATE_LIMIT: int = 5
+    LOGIN_RATE_WINDOW: int = 900  # 15 minutes in seconds
+    REGISTER_RATE_LIMIT: int = 20
+    REGISTER_RATE_WINDOW: int = 3600  # 1 hour in seconds
+    JOIN_RATE_LIMIT: int = 20
+    JOIN_RATE_WINDOW: int = 900  # 15 minutes in seconds
     
     # Database URL
     DATABASE_URL: str = os.getenv(
@@ -23,4 +58,7 @@ class Settings(BaseSettings):
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
     )
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Build the settings once, on first use; get_settings.cache_clear() reloads them."""
+    return Settings()
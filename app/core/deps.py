@@ -1,67 +1,85 @@
-from typing import Generator, Optional, Annotated
+from typing import AsyncGenerator, Callable, Optional, Annotated
 from fastapi import Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from app.db.session import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from app.core.cache import USER_CACHE_FIELDS, cache_user, get_cached_user
+from app.core.config import get_settings
+from app.db.redis import get_redis
+from app.db.session import get_scoped_session
 from app.models.user import User
-from datetime import datetime, timedelta
+import hashlib
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_db() -> Generator:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency to get a database session with proper error handling.
+    Dependency to get the request's database session, rolled back if the request fails.
     """
-    db = SessionLocal()
+    scoped_session = get_scoped_session()
+    db = scoped_session()
     try:
         yield db
-    except SQLAlchemyError as e:
-        logger.error(f"Database error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Database error occurred"
-        )
+    except Exception:
+        # Undo partial work; the app-level exception handlers build the response
+        await db.rollback()
+        raise
     finally:
-        db.close()
+        # Close the session and drop it from the task-local registry
+        await scoped_session.remove()
+
+def client_ip(request: Request) -> str:
+    """Return the client address used to key per-IP limits."""
+    return request.client.host if request.client else "unknown"
 
-class SessionManager:
+def hashed_username(request: Request) -> str:
+    """Return a digest of the submitted username so raw usernames never become Redis keys."""
+    username = request.query_params.get("username", "")
+    return hashlib.sha256(username.encode()).hexdigest()
+
+def rate_limit(key_func: Callable[[Request], str], policy: str):
     """
-    Manages user sessions with timeout and validation.
+    Build a dependency allowing at most {policy}_RATE_LIMIT requests per key
+    every {policy}_RATE_WINDOW seconds, as configured in the settings.
+    
+    Design Decisions:
+    - Limits are read from the settings on each request, not when routes are declared.
+    - Fixed-window counter via SET NX EX + INCR in a single pipeline round-trip; the
+      window's TTL is only set when the key is created, and works on Redis 6.2.
+    - Reject with 429 before the endpoint runs, so abusive traffic never reaches bcrypt.
+    - Fail open when Redis is unreachable rather than locking every user out; any
+      other Redis error is a bug and propagates.
     """
-    def __init__(self):
-        self.session_timeout = timedelta(hours=24)
-        self._sessions = {}
-
-    def validate_session(self, user_id: int) -> bool:
-        """Check if session is valid and not expired."""
-        if user_id not in self._sessions:
-            return False
-        
-        last_active = self._sessions[user_id]
-        if datetime.utcnow() - last_active > self.session_timeout:
-            del self._sessions[user_id]
-            return False
+    async def dependency(request: Request):
+        settings = get_settings()
+        limit = getattr(settings, f"{policy}_RATE_LIMIT")
+        window = getattr(settings, f"{policy}_RATE_WINDOW")
+        key = key_func(request)
+        try:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                pipe.set(key, 0, ex=window, nx=True)
+                pipe.incr(key)
+                _, count = await pipe.execute()
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            logger.warning(f"Redis error in rate limiter: {str(e)}")
+            return
         
-        return True
-
-    def update_session(self, user_id: int):
-        """Update session last activity time."""
-        self._sessions[user_id] = datetime.utcnow()
-
-    def clear_session(self, user_id: int):
-        """Clear user session."""
-        if user_id in self._sessions:
-            del self._sessions[user_id]
-
-# Initialize session manager
-session_manager = SessionManager()
+        if count > limit:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(window)}
+            )
+    
+    return dependency
 
 async def validate_auth(request: Request) -> int:
     """
     Validate authentication and return user ID.
+    
+    Expired sessions are dropped by the session store, so a present user_id is current.
     """
     user_id = request.session.get("user_id")
     if not user_id:
@@ -70,51 +88,51 @@ async def validate_auth(request: Request) -> int:
             detail="Not authenticated"
         )
     
-    if not session_manager.validate_session(user_id):
-        request.session.clear()
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Session expired"
-        )
-    
     return user_id
 
 async def get_current_user(
     request: Request,
-    db: Annotated[Session, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_db)],
     user_id: Annotated[int, Depends(validate_auth)]
 ) -> User:
     """
     Get and validate current user with proper error handling.
+    
+    The returned User is detached and only has id, organization_id and is_active
+    loaded; handlers change user rows with explicit UPDATE statements.
     """
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
-        
-        if not user:
-            session_manager.clear_session(user_id)
-            request.session.clear()
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        if not user.is_active:
-            session_manager.clear_session(user_id)
-            request.session.clear()
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User is inactive"
-            )
-        
-        session_manager.update_session(user_id)
-        return user
-        
-    except SQLAlchemyError as e:
-        logger.error(f"Database error in get_current_user: {str(e)}")
+    fields = await get_cached_user(user_id)
+    if fields is None:
+        row = (await db.execute(
+            select(*(getattr(User, field) for field in USER_CACHE_FIELDS)).where(User.id == user_id)
+        )).first()
+        if row:
+            fields = row._asdict()
+            await cache_user(fields)
+    
+    user = None
+    if fields is not None:
+        # A detached User holding only the auth columns; it is not added to the
+        # request session, so rollbacks cannot expire it and reading any other
+        # column raises DetachedInstanceError instead of lazy loading
+        user = User(**fields)
+        make_transient_to_detached(user)
+    
+    if not user:
+        request.session.clear()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Database error occurred"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
         )
+    
+    if not user.is_active:
+        request.session.clear()
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is inactive"
+        )
+    
+    return user
 
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
@@ -0,0 +1,107 @@
+from typing import Optional
+from redis.exceptions import RedisError
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import get_settings
+from app.db.redis import get_redis
+import json
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# Liveness/readiness probe paths; they never read or write the session
+SESSIONLESS_PATHS = frozenset({"/", "/health"})
+
+def _session_key(session_id: str) -> str:
+    return f"sess:{session_id}"
+
+class SettingsCORSMiddleware(CORSMiddleware):
+    """
+    CORS restricted to the configured origins, read when the middleware stack is built.
+    
+    Explicit origins are required: credentialed requests may not use a wildcard origin.
+    """
+    def __init__(self, app: ASGIApp):
+        super().__init__(
+            app,
+            allow_origins=get_settings().CORS_ORIGINS,
+            allow_credentials=True,
+            allow_methods=["GET", "POST", "PUT", "DELETE"],
+            allow_headers=["authorization", "content-type"],
+        )
+
+class RedisSessionMiddleware:
+    """
+    Server-side sessions stored in Redis behind an opaque cookie id.
+
+    Design Decisions:
+    - The cookie only carries a random id, so requests need no signing or decoding
+      and a session is revoked by deleting its key.
+    - Reads use GETEX to refresh the TTL, giving a sliding expiry without a second command.
+    - The session is only written when its contents change; an emptied session is deleted.
+    - A change of user_id rotates the id and deletes the old key, preventing session fixation.
+    - Probe paths skip the store entirely.
+    - Redis errors are logged and treated as an anonymous session.
+    """
+    def __init__(self, app: ASGIApp, same_site: str = "lax"):
+        # Instantiated when the middleware stack is built, so the settings are
+        # read at application startup rather than at import
+        settings = get_settings()
+        self.app = app
+        self.session_cookie = settings.SESSION_COOKIE_NAME
+        self.max_age = settings.SESSION_MAX_AGE
+        self.cookie_flags = f"path=/; Max-Age={self.max_age}; HttpOnly; SameSite={same_site}"
+        if settings.SESSION_COOKIE_SECURE:
+            self.cookie_flags += "; Secure"
+
+    async def _load(self, session_id: str) -> Optional[dict]:
+        try:
+            raw = await get_redis().getex(_session_key(session_id), ex=self.max_age)
+        except RedisError as e:
+            logger.warning(f"Redis error reading session: {str(e)}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or scope["path"] in SESSIONLESS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.session_cookie)
+        loaded = await self._load(session_id) if session_id else None
+        if loaded is None:
+            # Unknown or expired ids are never reused
+            session_id = None
+        scope["session"] = dict(loaded or {})
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                headers = MutableHeaders(scope=message)
+                try:
+                    if session:
+                        new_id = session_id
+                        if not session_id or session.get("user_id") != (loaded or {}).get("user_id"):
+                            # New session, login or user switch: issue a fresh id and revoke
+                            # the old one, so an id known before authentication is never promoted
+                            new_id = secrets.token_urlsafe(32)
+                            if session_id:
+                                await get_redis().delete(_session_key(session_id))
+                        if session != loaded:
+                            await get_redis().set(_session_key(new_id), json.dumps(session), ex=self.max_age)
+                        # Re-sent on every response so the cookie slides with the key's TTL
+                        headers.append("Set-Cookie", f"{self.session_cookie}={new_id}; {self.cookie_flags}")
+                    elif not session and session_id:
+                        await get_redis().delete(_session_key(session_id))
+                        headers.append(
+                            "Set-Cookie",
+                            f"{self.session_cookie}=null; path=/; expires=Thu, 01 Jan 1970 00:00:00 GMT"
+                        )
+                except RedisError as e:
+                    logger.warning(f"Redis error writing session: {str(e)}")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,38 +1,79 @@
+from functools import lru_cache
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache
+def _ctx() -> CryptContext:
+    # Built on first use so importing the module does not load hashing backends.
+    # New hashes use argon2id; existing bcrypt hashes still verify and are marked
+    # deprecated so they can be upgraded on the next successful login
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__memory_cost=19456,  # KiB
+        argon2__time_cost=2,
+        argon2__parallelism=1
+    )
+
+@lru_cache
+def _dummy_password_hash() -> str:
+    # Verified against when a login names an unknown user, so that path costs the same hashing work
+    return _ctx().hash("dummy-password")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify a plain password against a hashed password using bcrypt.
+    Verify a plain password against a hashed password.
     
     Design decisions:
     - Use passlib's CryptContext for password hashing and verification.
-    - Ensure bcrypt is used as the hashing scheme.
+    - Accept both argon2id and legacy bcrypt hashes.
+    - passlib compares the computed digest in constant time, so no plain equality is used here.
     
     Edge cases:
     - Handle invalid or malformed hashed passwords.
     - Ensure the function returns a boolean indicating the verification result.
     """
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return _ctx().verify(plain_password, hashed_password)
     except ValueError:
         # Handle the case where the hashed password is invalid or malformed
         return False
 
+def verify_and_update_password(
+    plain_password: str,
+    hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and return a replacement hash if the stored one is deprecated.
+    
+    Design decisions:
+    - Lets login migrate bcrypt hashes to argon2id without a separate rehash pass.
+    - A missing hash (unknown user) is checked against a dummy hash and always fails,
+      so the response takes as long as for a real user.
+    - Malformed hashes fail verification instead of raising.
+    """
+    if hashed_password is None:
+        _ctx().verify(plain_password, _dummy_password_hash())
+        return False, None
+    try:
+        return _ctx().verify_and_update(plain_password, hashed_password)
+    except ValueError:
+        return False, None
+
 def get_password_hash(password: str) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password using argon2id.
     
     Design decisions:
     - Use passlib's CryptContext for password hashing.
-    - Ensure bcrypt is used as the hashing scheme.
+    - argon2id is the context's default scheme, tuned to 19 MiB / 2 passes.
     
     Edge cases:
     - Handle potential errors during the hashing process.
     """
     try:
-        return pwd_context.hash(password)
+        return _ctx().hash(password)
     except Exception as e:
         # Handle any unexpected errors during hashing
         raise ValueError("An error occurred while hashing the password.") from e
\ No newline at end of file
@@ -0,0 +1,16 @@
+import asyncio
+from app.db.base import Base
+from app.db.session import get_engine
+
+async def init_db():
+    """Create any missing database tables."""
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+if __name__ == "__main__":
+    # Run once per deployment: python -m app.db.init_db
+    async def main():
+        await init_db()
+        await get_engine().dispose()
+
+    asyncio.run(main())
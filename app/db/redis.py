@@ -0,0 +1,8 @@
+from functools import lru_cache
+from redis.asyncio import Redis
+from app.core.config import get_settings
+
+@lru_cache
+def get_redis() -> Redis:
+    """Shared async Redis client, created on first use; connections are pooled by the client itself."""
+    return Redis.from_url(get_settings().REDIS_URL, decode_responses=True)
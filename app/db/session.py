@@ -1,15 +1,63 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from asyncio import current_task
+from functools import lru_cache
+from uuid import uuid4
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_scoped_session,
+    async_sessionmaker,
+    create_async_engine
+)
+from app.core.config import get_settings
 
-# Define connection parameters directly
-USERNAME = "username"
-PASSWORD = "password"
-HOST = "localhost"
-PORT = "5432"
-DBNAME = "cluster_management"
+def async_database_url(url: str) -> str:
+    """Point a plain postgresql:// DSN at the asyncpg driver."""
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
 
-DATABASE_URL = f"postgresql://{USERNAME}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}"
+@lru_cache
+def get_engine() -> AsyncEngine:
+    """Create the engine from the settings on first use."""
+    settings = get_settings()
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode hands each transaction a different server
+        # connection and already pools them, so:
+        # - asyncpg's per-connection prepared statement caches are disabled and any
+        #   statements it still prepares get unique names;
+        # - SQLAlchemy opens a connection per checkout instead of pooling on top.
+        # Sessions keep running in transactions: allocation, preemption and inserts
+        # must commit together, and transaction pooling supports that.
+        engine_options = {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+            }
+        }
+    else:
+        engine_options = {
+            "pool_pre_ping": True,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_use_lifo": settings.DB_POOL_USE_LIFO
+        }
+    return create_async_engine(async_database_url(settings.DATABASE_URL), **engine_options)
 
-# Create the engine and session
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@lru_cache
+def get_scoped_session() -> async_scoped_session[AsyncSession]:
+    """
+    Session registry bound to the engine.
+
+    One session per asyncio task, i.e. per request: every dependency and helper
+    running in the request shares it, and get_db removes it when the request ends.
+    """
+    session_factory = async_sessionmaker(
+        bind=get_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    return async_scoped_session(session_factory, scopefunc=current_task)
@@ -1,14 +1,17 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi import FastAPI, Request
+import anyio.to_thread
+import logging
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
 from app.api.v1.api import api_router
-from app.core.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.config import get_settings
+from app.core.middleware import RedisSessionMiddleware, SettingsCORSMiddleware
+from app.db.init_db import init_db
+from app.db.redis import get_redis
+from app.db.session import get_engine
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Cluster Management API",
@@ -68,28 +71,52 @@ app = FastAPI(
         }
     ],
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS and Session
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Both read their configuration from the settings when the middleware stack is built
+app.add_middleware(SettingsCORSMiddleware)
+app.add_middleware(RedisSessionMiddleware)
 
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.SECRET_KEY,
-    session_cookie=settings.SESSION_COOKIE_NAME,
-    max_age=settings.SESSION_MAX_AGE
-)
+@app.exception_handler(SQLAlchemyError)
+async def database_exception_handler(request: Request, exc: SQLAlchemyError):
+    # The get_db dependency has already rolled back the session
+    logger.exception("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(status_code=500, content={"detail": "Database error occurred"})
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    logger.exception("Unhandled error on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # Password hashing is the main threadpool user and is CPU-bound
+    anyio.to_thread.current_default_thread_limiter().total_tokens = get_settings().THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def create_tables():
+    # Schema creation is a one-off deployment step (python -m app.db.init_db);
+    # only do it on startup when explicitly enabled, e.g. for local development
+    if get_settings().AUTO_CREATE_TABLES:
+        await init_db()
+
+@app.on_event("startup")
+async def build_openapi_schema():
+    # FastAPI caches the generated schema on the app; build it before the first
+    # /openapi.json request instead of during it
+    app.openapi()
+
+@app.on_event("shutdown")
+async def close_connections():
+    await get_redis().aclose()
+    await get_engine().dispose()
+
 @app.get("/")
 async def health_check():
     return "healh check is successfull"
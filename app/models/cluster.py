@@ -3,9 +3,9 @@ from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class Cluster(Base):
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
-    organization_id = Column(Integer, ForeignKey("organization.id"))
+    organization_id = Column(Integer, ForeignKey("organization.id"), index=True)
     
     # Resource limits
     cpu_limit = Column(Float)
@@ -18,5 +18,5 @@ class Cluster(Base):
     gpu_available = Column(Float)
     
     # Relationships
-    organization = relationship("Organization", back_populates="clusters")
-    deployments = relationship("Deployment", back_populates="cluster")
+    organization = relationship("Organization", back_populates="clusters", lazy="raise")
+    deployments = relationship("Deployment", back_populates="cluster", lazy="raise")
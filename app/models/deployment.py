@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base_class import Base
@@ -10,7 +10,12 @@ class DeploymentStatus(enum.Enum):
     COMPLETED = "completed"
 
 class Deployment(Base):
-    id = Column(Integer, primary_key=True, index=True)
+    # Serves the preemption lookup: running deployments on a cluster ordered by priority
+    __table_args__ = (
+        Index("ix_deployment_cluster_status_priority", "cluster_id", "status", "priority"),
+    )
+    
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
     cluster_id = Column(Integer, ForeignKey("cluster.id"))
     docker_image = Column(String)
@@ -23,4 +28,5 @@ class Deployment(Base):
     gpu_required = Column(Float)
     
     # Relationships
-    cluster = relationship("Cluster", back_populates="deployments")
+    # Loaded explicitly where needed; never lazily
+    cluster = relationship("Cluster", back_populates="deployments", lazy="raise")
@@ -1,12 +1,18 @@
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
+import secrets
+
+def generate_invite_code() -> str:
+    """Random URL-safe invite code (64 bits of entropy)."""
+    return secrets.token_urlsafe(8)
 
 class Organization(Base):
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
-    invite_code = Column(String, unique=True, index=True)
+    # Generated in Python so INSERT ... RETURNING hands it back without a refresh
+    invite_code = Column(String, unique=True, index=True, default=generate_invite_code)
     
     # Relationships
-    users = relationship("User", back_populates="organization")
-    clusters = relationship("Cluster", back_populates="organization")
+    users = relationship("User", back_populates="organization", lazy="raise")
+    clusters = relationship("Cluster", back_populates="organization", lazy="raise")
@@ -3,7 +3,7 @@ from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class User(Base):
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
@@ -11,4 +11,6 @@ class User(Base):
     organization_id = Column(Integer, ForeignKey("organization.id"))
     
     # Relationships
-    organization = relationship("Organization", back_populates="users")
+    # Nothing on the request path reads user.organization; fail loudly instead
+    # of issuing a hidden lazy SELECT if that changes
+    organization = relationship("Organization", back_populates="users", lazy="raise")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 class ClusterBase(BaseModel):
@@ -20,5 +20,14 @@ class Cluster(ClusterBase):
     ram_available: float
     gpu_available: float
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class ClusterListItem(BaseModel):
+    id: int
+    name: str
+    organization_id: int
+    cpu_available: float
+    ram_available: float
+    gpu_available: float
+
+    model_config = ConfigDict(from_attributes=True)
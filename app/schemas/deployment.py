@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from app.models.deployment import DeploymentStatus
 
@@ -21,5 +21,4 @@ class Deployment(DeploymentBase):
     cluster_id: int
     status: DeploymentStatus
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,32 +1,68 @@
+import fakeredis
 import pytest
-from typing import Generator
+import pytest_asyncio
+from typing import AsyncGenerator, Generator
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.config import get_settings
+from app.db import redis as redis_client
+from app.db import session as db_session
+from app.core import cache
 from app.db.base import Base
 from app.main import app
-from app.core.deps import get_db
 
-# Use in-memory SQLite for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Use a SQLite file database for tests. NullPool opens connections on the
+# event loop that uses them, since TestClient runs the app on its own loop.
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=NullPool
+)
+TestingSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-@pytest.fixture(scope="session")
-def db() -> Generator:
-    Base.metadata.create_all(bind=engine)
-    yield TestingSessionLocal()
-    Base.metadata.drop_all(bind=engine)
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def db() -> AsyncGenerator:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with TestingSessionLocal() as session:
+        yield session
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
 
-@pytest.fixture(scope="module")
-def client() -> Generator:
-    def override_get_db():
-        try:
-            db = TestingSessionLocal()
-            yield db
-        finally:
-            db.close()
-    
-    app.dependency_overrides[get_db] = override_get_db
+@pytest.fixture
+def redis_server() -> fakeredis.FakeServer:
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def redis(redis_server, monkeypatch) -> Generator:
+    """Give each test an empty in-memory Redis (sessions, caches and rate limits)."""
+    class FakeRedis(fakeredis.FakeAsyncRedis):
+        @classmethod
+        def from_url(cls, url, **kwargs):
+            return super().from_url(url, server=redis_server, **kwargs)
+
+    monkeypatch.setattr(redis_client, "Redis", FakeRedis)
+    redis_client.get_redis.cache_clear()
+    cache._local_users.cache_clear()
+    yield redis_client.get_redis()
+    redis_client.get_redis.cache_clear()
+    cache._local_users.cache_clear()
+
+@pytest.fixture
+def database(db, monkeypatch) -> Generator:
+    """Bind the production engine and scoped session registry to the test database."""
+    monkeypatch.setenv("DATABASE_URL", SQLALCHEMY_DATABASE_URL)
+    get_settings.cache_clear()
+    db_session.get_engine.cache_clear()
+    db_session.get_scoped_session.cache_clear()
+    yield
+    get_settings.cache_clear()
+    db_session.get_engine.cache_clear()
+    db_session.get_scoped_session.cache_clear()
+
+@pytest.fixture
+def client(database, redis) -> Generator:
+    # Requests go through the production get_db; the app's shutdown hook
+    # disposes the engine
     with TestClient(app) as c:
         yield c
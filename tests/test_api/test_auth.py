@@ -0,0 +1,67 @@
+import fakeredis
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.core.config import get_settings
+
+API = "/api/v1"
+
+def register(client: TestClient, password: str = "password123") -> str:
+    username = f"user_{uuid4().hex[:12]}"
+    response = client.post(
+        f"{API}/auth/register",
+        json={"username": username, "email": f"{username}@example.com", "password": password}
+    )
+    assert response.status_code == 200, response.text
+    return username
+
+@pytest.mark.parametrize("redis_server", [fakeredis.FakeServer(version=(6, 2))])
+def test_login_rate_limited_on_redis_6_2(client: TestClient):
+    # The window must be set without Redis 7.0 commands such as EXPIRE NX, or the
+    # limiter fails open
+    limit = get_settings().LOGIN_RATE_LIMIT
+    username = register(client)
+
+    for _ in range(limit):
+        response = client.post(f"{API}/auth/login", params={"username": username, "password": "wrong"})
+        assert response.status_code == 401
+    response = client.post(f"{API}/auth/login", params={"username": username, "password": "wrong"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(get_settings().LOGIN_RATE_WINDOW)
+
+
+def test_login_rotates_session_id(client: TestClient):
+    cookie = get_settings().SESSION_COOKIE_NAME
+    first, second = register(client), register(client)
+
+    response = client.post(f"{API}/auth/login", params={"username": first, "password": "password123"})
+    assert response.status_code == 200
+    first_id = client.cookies[cookie]
+
+    # Logging in as another user over the same session must not keep its id
+    response = client.post(f"{API}/auth/login", params={"username": second, "password": "password123"})
+    assert response.status_code == 200
+    second_id = client.cookies[cookie]
+    assert second_id != first_id
+
+    client.cookies.set(cookie, first_id)
+    assert client.get(f"{API}/clusters/").status_code == 401
+    client.cookies.set(cookie, second_id)
+    assert client.post(f"{API}/organizations/", json={"name": f"org_{second}"}).status_code == 200
+
+def test_register_does_not_print_credentials(client: TestClient, capsys):
+    register(client, password="s3cret-password")
+    captured = capsys.readouterr()
+    assert "s3cret-password" not in captured.out + captured.err
+    assert "$argon2" not in captured.out + captured.err
+
+@pytest.mark.parametrize("field", ["username", "email"])
+def test_register_duplicate(client: TestClient, field: str):
+    username = register(client)
+    other = f"user_{uuid4().hex[:12]}"
+    body = {"username": other, "email": f"{other}@example.com", "password": "password123"}
+    body[field] = username if field == "username" else f"{username}@example.com"
+
+    response = client.post(f"{API}/auth/register", json=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username or email already registered"
@@ -0,0 +1,101 @@
+from uuid import uuid4
+from fastapi.testclient import TestClient
+
+API = "/api/v1"
+
+def create_cluster(client: TestClient, cpu: float = 10, ram: float = 16, gpu: float = 0) -> int:
+    """Register and log in a fresh user, give them an organization and return a new cluster's id."""
+    username = f"user_{uuid4().hex[:12]}"
+    password = "password123"
+    response = client.post(
+        f"{API}/auth/register",
+        json={"username": username, "email": f"{username}@example.com", "password": password}
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(f"{API}/auth/login", params={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    response = client.post(f"{API}/organizations/", json={"name": f"org_{username}"})
+    assert response.status_code == 200, response.text
+    response = client.post(
+        f"{API}/clusters/",
+        json={
+            "name": f"cluster_{username}",
+            "cpu_limit": cpu,
+            "ram_limit": ram,
+            "gpu_limit": gpu,
+            "organization_id": response.json()["id"]
+        }
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def deploy(client: TestClient, cluster_id: int, name: str, priority: int,
+           cpu: float, ram: float, gpu: float = 0) -> dict:
+    response = client.post(
+        f"{API}/deployments/",
+        json={
+            "name": name,
+            "docker_image": "nginx:latest",
+            "cpu_required": cpu,
+            "ram_required": ram,
+            "gpu_required": gpu,
+            "priority": priority,
+            "cluster_id": cluster_id
+        }
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def statuses(client: TestClient) -> dict:
+    response = client.get(f"{API}/deployments/")
+    assert response.status_code == 200, response.text
+    return {d["name"]: d["status"] for d in response.json()}
+
+def available(client: TestClient, cluster_id: int) -> tuple:
+    response = client.get(f"{API}/clusters/{cluster_id}")
+    assert response.status_code == 200, response.text
+    cluster = response.json()
+    return cluster["cpu_available"], cluster["ram_available"], cluster["gpu_available"]
+
+def test_allocation_decrements_cluster(client: TestClient):
+    cluster_id = create_cluster(client)
+    assert deploy(client, cluster_id, "a", priority=1, cpu=4, ram=2)["status"] == "running"
+    assert available(client, cluster_id) == (6, 14, 0)
+
+def test_lowest_priority_goes_pending_when_full(client: TestClient):
+    cluster_id = create_cluster(client)
+    deploy(client, cluster_id, "a", priority=1, cpu=10, ram=2)
+    assert deploy(client, cluster_id, "b", priority=0, cpu=1, ram=1)["status"] == "pending"
+    assert statuses(client) == {"a": "running", "b": "pending"}
+    assert available(client, cluster_id) == (0, 14, 0)
+
+def test_preempts_minimal_lowest_priority_prefix(client: TestClient):
+    cluster_id = create_cluster(client)
+    deploy(client, cluster_id, "a", priority=1, cpu=4, ram=2)
+    deploy(client, cluster_id, "b", priority=2, cpu=4, ram=3)
+    deploy(client, cluster_id, "c", priority=3, cpu=2, ram=1)
+
+    # Freeing "a" alone covers the 4 CPUs "d" needs; "b" and "c" keep running
+    assert deploy(client, cluster_id, "d", priority=5, cpu=4, ram=5)["status"] == "running"
+    assert statuses(client) == {"a": "failed", "b": "running", "c": "running", "d": "running"}
+
+def test_cluster_totals_after_preemption(client: TestClient):
+    cluster_id = create_cluster(client)
+    deploy(client, cluster_id, "a", priority=1, cpu=4, ram=2)
+    deploy(client, cluster_id, "b", priority=2, cpu=4, ram=3)
+    deploy(client, cluster_id, "c", priority=3, cpu=2, ram=1)
+    assert available(client, cluster_id) == (0, 10, 0)
+
+    deploy(client, cluster_id, "d", priority=5, cpu=4, ram=5)
+    # "a" returned (4, 2) and "d" took (4, 5)
+    assert available(client, cluster_id) == (0, 7, 0)
+
+def test_pending_when_whole_prefix_insufficient(client: TestClient):
+    cluster_id = create_cluster(client)
+    deploy(client, cluster_id, "a", priority=1, cpu=5, ram=2)
+    deploy(client, cluster_id, "b", priority=9, cpu=5, ram=2)
+
+    # Only "a" has a lower priority and its 5 CPUs are short of 8: nothing is preempted
+    assert deploy(client, cluster_id, "d", priority=5, cpu=8, ram=1)["status"] == "pending"
+    assert statuses(client) == {"a": "running", "b": "running", "d": "pending"}
+    assert available(client, cluster_id) == (0, 12, 0)
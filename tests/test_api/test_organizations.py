@@ -0,0 +1,100 @@
+import fakeredis
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+from app.models.organization import Organization
+from app.models.user import User
+from tests.conftest import TestingSessionLocal
+
+API = "/api/v1"
+
+def login(client: TestClient) -> str:
+    """Register a fresh user and log the client in as them."""
+    username = f"user_{uuid4().hex[:12]}"
+    response = client.post(
+        f"{API}/auth/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "password123"}
+    )
+    assert response.status_code == 200, response.text
+    response = client.post(f"{API}/auth/login", params={"username": username, "password": "password123"})
+    assert response.status_code == 200, response.text
+    return username
+
+def test_organization_less_user_not_cached(client: TestClient, redis_server: fakeredis.FakeServer):
+    store = fakeredis.FakeRedis(server=redis_server)
+    login(client)
+
+    # Authenticated but not a member yet: a cached None could outlive create/join
+    assert client.get(f"{API}/clusters/").status_code == 400
+    assert store.keys("user:*") == []
+
+    assert client.post(f"{API}/organizations/", json={"name": "acme"}).status_code == 200
+    assert client.get(f"{API}/clusters/").status_code == 200
+    assert len(store.keys("user:*")) == 1
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failed_create_rolls_back_organization(client: TestClient):
+    username = login(client)
+    assert client.post(f"{API}/organizations/", json={"name": f"first_{username}"}).status_code == 200
+
+    # The organization is inserted before the membership UPDATE fails
+    response = client.post(f"{API}/organizations/", json={"name": f"second_{username}"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User already belongs to an organization"
+
+    async with TestingSessionLocal() as session:
+        orphans = await session.scalar(
+            select(func.count()).select_from(Organization).where(Organization.name == f"second_{username}")
+        )
+    assert orphans == 0
+
+def test_join_with_unknown_invite_code(client: TestClient):
+    login(client)
+    response = client.post(f"{API}/organizations/bogus-code/join")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Organization not found"
+
+def test_join_when_already_a_member(client: TestClient):
+    login(client)
+    invite_code = client.post(f"{API}/organizations/", json={"name": "acme"}).json()["invite_code"]
+
+    # Membership is reported before the invite code, even for a valid one
+    for code in (invite_code, "bogus-code"):
+        response = client.post(f"{API}/organizations/{code}/join")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "User already belongs to an organization"
+
+def test_join_with_invite_code(client: TestClient):
+    login(client)
+    invite_code = client.post(f"{API}/organizations/", json={"name": "acme"}).json()["invite_code"]
+
+    login(client)
+    assert client.post(f"{API}/organizations/{invite_code}/join").status_code == 200
+    assert client.get(f"{API}/clusters/").status_code == 200
+
+def test_create_when_already_a_member(client: TestClient):
+    login(client)
+    assert client.post(f"{API}/organizations/", json={"name": "acme"}).status_code == 200
+    response = client.post(f"{API}/organizations/", json={"name": "other"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User already belongs to an organization"
+
+def test_membership_requires_login(client: TestClient):
+    assert client.post(f"{API}/organizations/", json={"name": "acme"}).status_code == 401
+    assert client.post(f"{API}/organizations/bogus-code/join").status_code == 401
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_membership_rejects_inactive_user(client: TestClient):
+    username = login(client)
+    async with TestingSessionLocal() as session:
+        await session.execute(update(User).where(User.username == username).values(is_active=False))
+        await session.commit()
+
+    # Inactivity is reported before membership and invite code checks
+    for response in (
+        client.post(f"{API}/organizations/", json={"name": "acme"}),
+        client.post(f"{API}/organizations/bogus-code/join")
+    ):
+        assert response.status_code == 403
+        assert response.json()["detail"] == "User is inactive"
@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import func, select
+from app.core.deps import get_db
+from app.db.session import get_engine, get_scoped_session
+from app.models.organization import Organization
+from tests.conftest import TestingSessionLocal
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_db_rolls_back_and_removes_session(database):
+    registry = get_scoped_session()
+    dependency = get_db()
+    db = await dependency.__anext__()
+    # Helpers running in the same task share the request's session
+    assert registry() is db
+
+    db.add(Organization(name="rolled back"))
+    await db.flush()
+    with pytest.raises(RuntimeError):
+        await dependency.athrow(RuntimeError("handler failed"))
+
+    assert not registry.registry.has()
+    async with TestingSessionLocal() as session:
+        count = await session.scalar(
+            select(func.count()).select_from(Organization).where(Organization.name == "rolled back")
+        )
+    assert count == 0
+    await get_engine().dispose()